@@ -63,6 +63,9 @@ def main():
     # folder path to power bi data
     power_bi_data = "power_bi_data"
 
+    # folder path to cached yahoo finance data, prices are downloaded again at most once a day
+    yahoo_cache_folder_path = "yahoo_cache"
+
     # ------------------- portfolio analysis ------------------- #
 
     # take securities names from tickers_and_currencies dictionary
@@ -85,21 +88,28 @@ def main():
         currencies_securities + currencies_transation_payments + currencies_fee_payments
     )
 
-    # take distinct currencies
-    distinct_currencies = list(set(currencies))
+    # take distinct currencies keeping the order of their first occurrence so that downloaded tickers are the same on every run
+    distinct_currencies = list(dict.fromkeys(currencies))
 
     # download securities data and exchange rates from yahoo finance in a daily frequency
     securities_data, exchange_rates = download_yahoo(
-        tickers, distinct_currencies, ohlc, analysis_currency, securities
+        tickers,
+        distinct_currencies,
+        ohlc,
+        analysis_currency,
+        securities,
+        yahoo_cache_folder_path,
     )
 
     # calculate values of securities in analysis currency
-    for ticker, currency in tickers_and_currencies.items():
-        security_name = ticker.split(".")[0]
-        currency_pair = currency + analysis_currency
-        securities_data[security_name] = (
-            securities_data[security_name] * exchange_rates[currency_pair]
-        )
+    # exchange rates for each security are aligned to securities data so that all securities are converted at once
+    currency_pairs_securities = [
+        currency + analysis_currency for currency in currencies_securities
+    ]
+    securities_exchange_rates = exchange_rates.reindex(securities_data.index)[
+        currency_pairs_securities
+    ].to_numpy()
+    securities_data[:] = securities_data.to_numpy() * securities_exchange_rates
 
     # prepare portfolio data for analysis using downloaded data and portfolio data files
     portfolio_data = prepare_portfolio_data(
@@ -113,11 +123,13 @@ def main():
         first_transaction_date,
     )
 
-    # save concatenated and converted portfolio data with the columns in the more readable order to csv file
-    securities_count = [security + COUNT_SUFFIX for security in securities]
+    # save concatenated and converted portfolio data with the columns in the more readable order to parquet file
+    securities_count = securities_columns_names(securities)[COUNT_SUFFIX]
     portfolio_data[
         [TRANSACTION_PAYMENT_COLUMN_NAME, FEE_PAYMENT_COLUMN_NAME] + securities_count
-    ].to_csv(os.path.join(power_bi_data, "portfolio_data.csv"))
+    ].to_parquet(
+        os.path.join(power_bi_data, "portfolio_data.parquet"), compression="snappy"
+    )
 
     # calculate portfolio values, expenses, profits, etc. for each security since the first transaction date
     portfolio_data_calculations = calculate_portfolio_values(
@@ -125,24 +137,27 @@ def main():
         securities,
     )
 
-    # save portfolio data calculations to csv file
+    # save portfolio data calculations to parquet file
     columns_to_leave = [
         PORTFOLIO + VALUE_SUFFIX,
         PORTFOLIO + EXPENSE_SUFFIX,
         PORTFOLIO + PROFIT_SUFFIX,
         PORTFOLIO + DRAWDOWN_SUFFIX,
     ]
-    portfolio_data_calculations[columns_to_leave].to_csv(
-        os.path.join(power_bi_data, "portfolio_data_calculations.csv")
+    portfolio_data_calculations[columns_to_leave].to_parquet(
+        os.path.join(power_bi_data, "portfolio_data_calculations.parquet"),
+        compression="snappy",
     )
 
     portfolio_current_data = calculate_current_status(
         portfolio_data_calculations, weights_groups, securities
     )
 
-    # save portfolio current data to csv file
-    portfolio_current_data.to_csv(
-        os.path.join(power_bi_data, "portfolio_status.csv"), header=False
+    # save portfolio current data to parquet file as a table with names and values columns
+    portfolio_current_data.rename_axis(STATUS_NAME_COLUMN_NAME).reset_index(
+        name=STATUS_VALUE_COLUMN_NAME
+    ).to_parquet(
+        os.path.join(power_bi_data, "portfolio_status.parquet"), compression="snappy"
     )
 
 
@@ -1,9 +1,14 @@
-import matplotlib.pyplot as plt
 import yfinance as yf
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import datetime
+import hashlib
 import os
 
+from portfolio_kernels import drawdown, nan_to_zero_cumsum
+
 
 # transaction payments column name
 TRANSACTION_PAYMENT_COLUMN_NAME = "TRANSACTION_PAYMENT"
@@ -11,12 +16,20 @@ TRANSACTION_PAYMENT_COLUMN_NAME = "TRANSACTION_PAYMENT"
 # fee payments column name
 FEE_PAYMENT_COLUMN_NAME = "FEE_PAYMENT"
 
+# transaction and fee payments currencies column names used before payments are converted to analysis currency
+TRANSACTION_CURRENCY_COLUMN_NAME = "TRANSACTION_CURRENCY"
+FEE_CURRENCY_COLUMN_NAME = "FEE_CURRENCY"
+
 # portfolio column name
 PORTFOLIO = "PORTFOLIO"
 
 # portfolio data index name
 DATE = "DATE"
 
+# portfolio status column names for names and values of the current portfolio properties
+STATUS_NAME_COLUMN_NAME = "NAME"
+STATUS_VALUE_COLUMN_NAME = "VALUE"
+
 # suffixes for columns with securities count, value, unit value, expense and profit
 COUNT_SUFFIX = "_COUNT"
 VALUE_SUFFIX = "_VALUE"
@@ -28,7 +41,110 @@ VALUE_AND_EXPENSE_SUFFIX = "_VALUE_AND_EXPENSE"
 DRAWDOWN_SUFFIX = "_DRAWDOWN"
 
 
-def download_yahoo(tickers, distinct_currencies, ohlc, analysis_currency, securities):
+def securities_columns_names(securities):
+    """
+    Creates columns names for all securities properties at once
+
+    Parameters
+    ----------
+    securities : list
+        List of securities names
+
+    Returns
+    -------
+    dict
+        Dictionary with properties suffixes as keys and lists of corresponding columns names for securities as values
+    """
+    return {
+        suffix: [security + suffix for security in securities]
+        for suffix in (
+            COUNT_SUFFIX,
+            VALUE_SUFFIX,
+            UNIT_VALUE_SUFFIX,
+            EXPENSE_SUFFIX,
+            PROFIT_SUFFIX,
+        )
+    }
+
+
+def download_yahoo_prices(yahoo_tickers, ohlc, cache_folder_path):
+    """
+    Downloads prices from yahoo finance for all tickers in a single call or loads them from the cache file if they have already been downloaded today
+
+    Parameters
+    ----------
+    yahoo_tickers : list
+        List of yahoo finance tickers to download
+    ohlc : str
+        Open, High, Low, Close data to download
+    cache_folder_path : str
+        Path to folder with cached yahoo finance data
+
+    Returns
+    -------
+    DataFrame
+        DataFrame with downloaded prices for tickers in the order of yahoo_tickers
+    """
+    # cache file name is keyed by today's date, ohlc and tickers list so that cache is valid only for the same download
+    cache_file_prefix = f"yahoo_{datetime.date.today():%Y-%m-%d}_"
+    tickers_key = hashlib.md5(",".join(yahoo_tickers).encode()).hexdigest()
+    cache_file_path = os.path.join(
+        cache_folder_path,
+        f"{cache_file_prefix}{ohlc.lower()}_{tickers_key}.parquet",
+    )
+
+    # load prices from the cache file if it exists
+    if os.path.exists(cache_file_path):
+        return pd.read_parquet(cache_file_path)
+
+    # download data for all tickers at once grouped by ticker
+    yahoo_data = yf.download(
+        yahoo_tickers, period="max", threads=True, group_by="ticker"
+    )
+
+    # yahoo finance does not raise when a download fails but returns an empty DataFrame
+    if yahoo_data.empty:
+        raise ValueError(f"No data downloaded from yahoo finance for {yahoo_tickers}")
+
+    # take only ohlc prices for each ticker
+    if isinstance(yahoo_data.columns, pd.MultiIndex):
+        yahoo_prices = yahoo_data.xs(ohlc, axis=1, level=1)
+    else:
+        # data for a single ticker may be returned without ticker level in columns
+        yahoo_prices = yahoo_data[[ohlc]]
+        yahoo_prices.columns = yahoo_tickers
+
+    # set columns order to a specified one in order to correctly set columns names later
+    # tickers which failed to download are missing or have only NaN values so they are not cached
+    yahoo_prices = yahoo_prices.reindex(columns=yahoo_tickers)
+    failed_tickers = yahoo_prices.columns[yahoo_prices.isna().all()].tolist()
+    if failed_tickers:
+        raise ValueError(
+            f"Failed to download data from yahoo finance for {failed_tickers}"
+        )
+
+    # save prices to the cache file
+    os.makedirs(cache_folder_path, exist_ok=True)
+    yahoo_prices.to_parquet(cache_file_path)
+
+    # remove cache files from previous days as they will not be used anymore
+    for cache_file_name in os.listdir(cache_folder_path):
+        if cache_file_name.startswith("yahoo_") and not cache_file_name.startswith(
+            cache_file_prefix
+        ):
+            os.remove(os.path.join(cache_folder_path, cache_file_name))
+
+    return yahoo_prices
+
+
+def download_yahoo(
+    tickers,
+    distinct_currencies,
+    ohlc,
+    analysis_currency,
+    securities,
+    cache_folder_path,
+):
     """
     Downloads data from yahoo finance for tickers and currencies
 
@@ -44,6 +160,8 @@ def download_yahoo(tickers, distinct_currencies, ohlc, analysis_currency, securi
         Currency in which the analysis will be done
     securities : list
         List of securities names
+    cache_folder_path : str
+        Path to folder with cached yahoo finance data
 
     Returns
     -------
@@ -55,56 +173,41 @@ def download_yahoo(tickers, distinct_currencies, ohlc, analysis_currency, securi
     # convert ohlc to upper case first letter and lower case the rest
     ohlc = ohlc[0].upper() + ohlc[1:].lower()
 
-    # download securities data from yahoo finance
-    yahoo_securities_data = yf.download(tickers, period="max")[ohlc]
-    df_securities = pd.DataFrame(yahoo_securities_data)
-
-    # set columns order to a specified one in order to correctly set columns names later
-    df_securities = df_securities[tickers]
-
-    # set index name to DATE and set columns names to securities names
-    df_securities.index.name = DATE
-    df_securities.columns = securities
-
     # create list of currency pairs to download exchange rates for
     distinct_currency_pairs = [
         currency + analysis_currency for currency in distinct_currencies
     ]
 
     # remove currency pair which is the same as analysis currency
-    distinct_currency_pairs.remove(analysis_currency * 2)
+    if analysis_currency in distinct_currencies:
+        distinct_currency_pairs.remove(analysis_currency * 2)
 
-    # if currency pairs are specified then download exchange rates for them else set exchange rates to None
+    # create yahoo finance tickers for currency pairs
     distinct_currency_pairs_format = [
         currency + "=X" for currency in distinct_currency_pairs
     ]
 
-    # download exchange rates from yahoo finance if there are any distinct currency pairs different than analysis currency
-    # if distinct_currency_pairs_format:
-    yahoo_currencies_data = yf.download(distinct_currency_pairs_format, period="max")[
-        ohlc
-    ]
+    # download securities data and exchange rates from yahoo finance at once
+    yahoo_prices = download_yahoo_prices(
+        tickers + distinct_currency_pairs_format, ohlc, cache_folder_path
+    )
 
-    # check if yahoo_currencies_data is a Series or DataFrame
-    if isinstance(yahoo_currencies_data, pd.Series):
-        # create DataFrame with downloaded exchange rate and set column name to currency pair
-        exchange_rates = pd.DataFrame(yahoo_currencies_data)
-        exchange_rates.columns = distinct_currency_pairs
-    else:
-        # set columns order to a specified one in order to correctly set columns names later
-        exchange_rates = yahoo_currencies_data[distinct_currency_pairs_format]
-        exchange_rates.columns = distinct_currency_pairs
+    # take securities data and drop dates for which only exchange rates were downloaded
+    df_securities = yahoo_prices[tickers].dropna(how="all")
+
+    # set index name to DATE and set columns names to securities names
+    df_securities.index.name = DATE
+    df_securities.columns = securities
+
+    # take exchange rates for the dates of securities data as only these dates are used in the analysis
+    exchange_rates = yahoo_prices[distinct_currency_pairs_format].reindex(
+        df_securities.index
+    )
+    exchange_rates.columns = distinct_currency_pairs
 
     # if there is analysis currency in distinct currencies then add column with exchange rates equal to 1.0
-    if distinct_currencies.index(analysis_currency) != -1:
-        analysis_currency_exchange_rates = pd.Series(
-            [1.0 for _ in range(len(df_securities.index))],
-            index=df_securities.index,
-            name=analysis_currency * 2,
-        )
-        exchange_rates = pd.concat(
-            [exchange_rates, analysis_currency_exchange_rates], axis=1
-        )
+    if analysis_currency in distinct_currencies:
+        exchange_rates[analysis_currency * 2] = np.float32(1.0)
 
     return df_securities, exchange_rates
 
@@ -112,10 +215,8 @@ def download_yahoo(tickers, distinct_currencies, ohlc, analysis_currency, securi
 def load_portfolio_transactions_data(
     portfolio_data_file_name,
     data_folder_path,
-    exchange_rates,
     transaction_payment_list,
     fee_payment_list,
-    analysis_currency,
 ):
     """
     Loads data from .csv file with portfolio transactions data
@@ -126,51 +227,64 @@ def load_portfolio_transactions_data(
         Name of the .csv file with portfolio data
     data_folder_path : str
         Path to folder with portfolio data files
-    exchange_rates : DataFrame
-        DataFrame with exchange rates
     transaction_payment_list : list
         List with transaction payment column as a first element and its currency as a second element
     fee_payment_list : list
         List with fee payment column as a first element and its currency as a second element
-    analysis_currency : str
-        Currency which will be used for analysis
 
     Returns
     -------
     DataFrame
-        DataFrame with portfolio transactions data converted to analysis currency
+        DataFrame with portfolio transactions data with payments in their original currencies and columns with these currencies
     """
-    portfolio_data = pd.read_csv(
-        os.path.join(data_folder_path, portfolio_data_file_name),
-        index_col=0,
-        low_memory=False,
-    )
-    portfolio_data.index = pd.to_datetime(portfolio_data.index, format="%Y-%m-%d")
-    portfolio_data.index.name = DATE
-
-    # convert transaction and fee payments to analysis currency
     transaction_column_name = transaction_payment_list[0]
     fee_column_name = fee_payment_list[0]
 
-    transaction_currency_pair = transaction_payment_list[1] + analysis_currency
-    fee_currency_pair = fee_payment_list[1] + analysis_currency
+    # load portfolio data with multithreaded pyarrow reader with payments columns types specified upfront
+    portfolio_table = pacsv.read_csv(
+        os.path.join(data_folder_path, portfolio_data_file_name),
+        convert_options=pacsv.ConvertOptions(
+            column_types={
+                transaction_column_name: pa.float64(),
+                fee_column_name: pa.float64(),
+            },
+        ),
+    )
 
-    # convert transaction and fee payments to analysis currency and assign them to a new column
-    # to resolve an issue that Pandas cannot reindex on an axis with duplicate labels I will do it in a loop
-    for index in portfolio_data.index:
-        portfolio_data.loc[index, TRANSACTION_PAYMENT_COLUMN_NAME] = (
-            portfolio_data.loc[index, transaction_column_name]
-            * exchange_rates.loc[index, transaction_currency_pair]
-        )
+    # pyarrow infers dates in the first column as date32 which pandas converts to objects so cast them to the same timestamps as in the securities data
+    date_column_name = portfolio_table.column_names[0]
+    portfolio_table = portfolio_table.set_column(
+        0, date_column_name, portfolio_table.column(0).cast(pa.timestamp("ns"))
+    )
 
-        portfolio_data.loc[index, FEE_PAYMENT_COLUMN_NAME] = (
-            portfolio_data.loc[index, fee_column_name]
-            * exchange_rates.loc[index, fee_currency_pair]
-        )
+    # columns with all values empty are inferred as null type which pandas converts to objects so cast them to floats as pandas reader does
+    for column_index, field in enumerate(portfolio_table.schema):
+        if pa.types.is_null(field.type):
+            portfolio_table = portfolio_table.set_column(
+                column_index,
+                field.name,
+                portfolio_table.column(column_index).cast(pa.float64()),
+            )
+
+    portfolio_data = portfolio_table.to_pandas(split_blocks=True, self_destruct=True)
+    portfolio_data = portfolio_data.set_index(date_column_name)
+    portfolio_data.index.name = DATE
 
-    # drop transaction and fee payments columns
-    portfolio_data = portfolio_data.drop(
-        [transaction_column_name, fee_column_name], axis=1
+    # rename transaction and fee payments columns to common names so that payments from all files can be converted to analysis currency at once after concatenation
+    portfolio_data = portfolio_data.rename(
+        columns={
+            transaction_column_name: TRANSACTION_PAYMENT_COLUMN_NAME,
+            fee_column_name: FEE_PAYMENT_COLUMN_NAME,
+        }
+    )
+
+    # store currencies of transaction and fee payments for each transaction
+    transactions_codes = np.zeros(len(portfolio_data.index), dtype=np.int8)
+    portfolio_data[TRANSACTION_CURRENCY_COLUMN_NAME] = pd.Categorical.from_codes(
+        transactions_codes, categories=[transaction_payment_list[1]]
+    )
+    portfolio_data[FEE_CURRENCY_COLUMN_NAME] = pd.Categorical.from_codes(
+        transactions_codes, categories=[fee_payment_list[1]]
     )
 
     return portfolio_data
@@ -220,13 +334,12 @@ def prepare_portfolio_data(
     ].copy()
 
     # fill NaN values with previous values as we assume that if there is no value for a day it means that the stock market was closed that day and the value is the same as the previous day
-    securities_data = securities_data.fillna(method="ffill")
-
     # just in case if there are still NaN values as the first rows of the DataFrame we fill them with 0
-    securities_data = securities_data.fillna(0)
+    # float32 precision is enough for securities prices and halves the memory used by them
+    securities_data = securities_data.ffill().fillna(0.0).astype(np.float32)
 
-    # load portfolio data from .csv files where dates, securities and values of transactions are stored and concatenate them into one DataFrame
-    portfolio_data = pd.DataFrame()
+    # load portfolio data from .csv files where dates, securities and values of transactions are stored
+    portfolio_data_parts = []
     for (
         portfolio_data_file_name,
         payment_columns,
@@ -242,17 +355,52 @@ def prepare_portfolio_data(
         fee_payment_list = [fee_column, fee_currency]
 
         # load part of portfolio data from .csv file
-        portfolio_data_part = load_portfolio_transactions_data(
-            portfolio_data_file_name,
-            data_folder_path,
-            exchange_rates,
-            transaction_payment_list,
-            fee_payment_list,
-            analysis_currency,
+        portfolio_data_parts.append(
+            load_portfolio_transactions_data(
+                portfolio_data_file_name,
+                data_folder_path,
+                transaction_payment_list,
+                fee_payment_list,
+            )
         )
 
-        # concatenate part of portfolio data with the rest of portfolio data
-        portfolio_data = pd.concat([portfolio_data, portfolio_data_part])
+    # concatenate all parts of portfolio data into one DataFrame at once
+    portfolio_data = pd.concat(portfolio_data_parts)
+
+    # take exchange rates for every transaction date
+    # exchange rates are indexed by unique dates so they can be reindexed on portfolio data dates even if those are duplicated
+    transactions_exchange_rates = exchange_rates.reindex(
+        portfolio_data.index
+    ).to_numpy()
+    transactions_positions = np.arange(len(portfolio_data.index))
+
+    # convert transaction and fee payments of all portfolio files to analysis currency
+    # exchange rate of each transaction is taken from the column of the currency pair of its payment
+    # numpy arrays are indexed positionally so duplicated dates in portfolio data index are not an issue
+    for payment_column_name, currency_column_name in (
+        (TRANSACTION_PAYMENT_COLUMN_NAME, TRANSACTION_CURRENCY_COLUMN_NAME),
+        (FEE_PAYMENT_COLUMN_NAME, FEE_CURRENCY_COLUMN_NAME),
+    ):
+        currency_pairs = (
+            portfolio_data[currency_column_name].astype(str) + analysis_currency
+        )
+        currency_pairs_positions = exchange_rates.columns.get_indexer(currency_pairs)
+        # payments in currencies without downloaded exchange rates cannot be converted
+        missing_currency_pairs = currency_pairs[currency_pairs_positions == -1]
+        if not missing_currency_pairs.empty:
+            raise KeyError(missing_currency_pairs.unique().tolist())
+
+        portfolio_data[payment_column_name] = (
+            portfolio_data[payment_column_name].to_numpy()
+            * transactions_exchange_rates[
+                transactions_positions, currency_pairs_positions
+            ]
+        )
+
+    # drop columns with currencies of payments as payments are already converted to analysis currency
+    portfolio_data = portfolio_data.drop(
+        [TRANSACTION_CURRENCY_COLUMN_NAME, FEE_CURRENCY_COLUMN_NAME], axis=1
+    )
 
     # merge raw securities data with portfolio data
     portfolio_data = securities_data.join(portfolio_data, rsuffix=COUNT_SUFFIX)
@@ -283,112 +431,85 @@ def calculate_portfolio_values(
         DataFrame with portfolio data with calculated values
     """
     # list of columns for portfolio different values for each security
-    securities_count = [col + COUNT_SUFFIX for col in securities]
-    securities_value = [col + VALUE_SUFFIX for col in securities]
-    securities_unit_value = [col + UNIT_VALUE_SUFFIX for col in securities]
-    securities_expense = [col + EXPENSE_SUFFIX for col in securities]
-    securities_profit = [col + PROFIT_SUFFIX for col in securities]
-
-    # assign values from portfolio_data_columns_count to portfolio_data_columns_value and portfolio_data_columns_expense as values and expenses will be calculated later using these count values
-    portfolio_data[securities_value] = portfolio_data[securities_count]
-    portfolio_data[securities_expense] = portfolio_data[securities_count]
+    columns_names = securities_columns_names(securities)
+    securities_count = columns_names[COUNT_SUFFIX]
+    securities_value = columns_names[VALUE_SUFFIX]
+    securities_unit_value = columns_names[UNIT_VALUE_SUFFIX]
+    securities_expense = columns_names[EXPENSE_SUFFIX]
+    securities_profit = columns_names[PROFIT_SUFFIX]
 
     # rename columns to more informative names
     portfolio_data = portfolio_data.rename(
         columns=dict(zip(securities, securities_unit_value))
     )
 
-    # temporarily reset index to get rid of duplicate index values
-    portfolio_data = portfolio_data.reset_index()
-
-    # security expense without transaction fee
-    for security_expense in securities_expense:
-        portfolio_data[security_expense] = portfolio_data[
-            portfolio_data[security_expense] > 0
-        ][TRANSACTION_PAYMENT_COLUMN_NAME]
-
-    # set index back to DATE
-    portfolio_data = portfolio_data.set_index(DATE)
+    # security expense without transaction fee, it is a transaction payment for rows where the security was bought and NaN otherwise
+    portfolio_data[securities_expense] = np.where(
+        portfolio_data[securities_count].to_numpy() > 0,
+        portfolio_data[TRANSACTION_PAYMENT_COLUMN_NAME].to_numpy()[:, None],
+        np.nan,
+    )
 
     # separate securities unit values from other columns and drop duplicates in DATE column from these separated securities unit values
     duplicated_idx = portfolio_data.index.duplicated()
-    unit_values_data = portfolio_data.loc[~duplicated_idx, securities_unit_value].copy()
-
-    # drop securities unit values from portfolio_data DataFrame
-    portfolio_data = portfolio_data.drop(securities_unit_value, axis=1)
-
-    # group by DATE and sum all the values for each DATE
-    portfolio_data = portfolio_data.groupby(DATE).sum()
-
-    # join portfolio_data DataFrame with separated earlier securities unit values
-    portfolio_data = portfolio_data.join(unit_values_data)
-
-    # currently in securities values there is only count of securities securities as an auxiliary column to calculate portfolio values later
-    # we fill NaN values with 0 and calculate cummulative sum to get the number of securities in the portfolio at a given time
-    portfolio_data[securities_value] = (
-        portfolio_data[securities_value].fillna(0).cumsum()
+    unit_values_data = portfolio_data.loc[~duplicated_idx, securities_unit_value]
+
+    # drop securities unit values from portfolio_data DataFrame and sum all the values for each DATE
+    # portfolio data is already sorted by DATE so groups do not need to be sorted again
+    portfolio_data = (
+        portfolio_data.drop(securities_unit_value, axis=1)
+        .groupby(level=0, sort=False)
+        .sum()
     )
 
-    # calculate portfolio values for each security using currently stored count of securities and unit value
-    for security_value, security_unit_value in zip(
-        securities_value, securities_unit_value
-    ):
-        portfolio_data[security_value] = (
-            portfolio_data[security_value] * portfolio_data[security_unit_value]
-        )
+    # assign separated earlier securities unit values to the grouped portfolio data
+    portfolio_data[securities_unit_value] = unit_values_data.reindex(
+        portfolio_data.index
+    ).to_numpy()
 
-    # fill all the remaining NaN values with 0
-    portfolio_data = portfolio_data.fillna(0)
-
-    # calculate cummulative sum of expenses and count of securities
-    portfolio_data[securities_expense] = portfolio_data[securities_expense].cumsum()
-    portfolio_data[securities_count] = portfolio_data[securities_count].cumsum()
+    # take blocks of columns as numpy arrays once so that all the calculations below are done on arrays
+    # we fill NaN values with 0 as there are no transactions or unit values for these dates
+    securities_unit_value_data = np.nan_to_num(
+        portfolio_data[securities_unit_value].to_numpy(dtype=np.float64)
+    )
 
     # add fees to transaction payments
-    portfolio_data[TRANSACTION_PAYMENT_COLUMN_NAME] = (
-        portfolio_data[TRANSACTION_PAYMENT_COLUMN_NAME]
-        + portfolio_data[FEE_PAYMENT_COLUMN_NAME]
+    payments_data = np.nan_to_num(
+        portfolio_data[TRANSACTION_PAYMENT_COLUMN_NAME].to_numpy(dtype=np.float64)
+    ) + np.nan_to_num(
+        portfolio_data[FEE_PAYMENT_COLUMN_NAME].to_numpy(dtype=np.float64)
     )
 
-    # calculate cummulative sum of portfolio expenses as a sum of transaction payments and fees
-    portfolio_data[PORTFOLIO + EXPENSE_SUFFIX] = portfolio_data[
-        TRANSACTION_PAYMENT_COLUMN_NAME
-    ].cumsum()
-
-    # calculate portfolio value as a sum of securities values
-    portfolio_data[PORTFOLIO + VALUE_SUFFIX] = portfolio_data[securities_value].sum(
-        axis=1
+    # calculate cummulative sum of count of securities to get the number of securities in the portfolio at a given time and cummulative sum of expenses
+    # NaN values are treated as 0 while summing as there are no transactions for these dates
+    securities_count_data = nan_to_zero_cumsum(
+        portfolio_data[securities_count].to_numpy(dtype=np.float64)
     )
-
-    # calculate portfolio profit as a difference between portfolio value and portfolio expense
-    portfolio_data[PORTFOLIO + PROFIT_SUFFIX] = (
-        portfolio_data[PORTFOLIO + VALUE_SUFFIX]
-        - portfolio_data[PORTFOLIO + EXPENSE_SUFFIX]
+    securities_expense_data = nan_to_zero_cumsum(
+        portfolio_data[securities_expense].to_numpy(dtype=np.float64)
     )
 
+    # calculate portfolio values for each security using count of securities and unit value
+    securities_value_data = securities_count_data * securities_unit_value_data
+
     # calculate profit for each security as a difference between security value and security expense
-    for security_value, security_expense, security_profit in zip(
-        securities_value, securities_expense, securities_profit
-    ):
-        portfolio_data[security_profit] = (
-            portfolio_data[security_value] - portfolio_data[security_expense]
-        )
+    securities_profit_data = securities_value_data - securities_expense_data
 
-    # calculate portfolio drawdowns
-    for date in portfolio_data.index:
-        max_value = portfolio_data.loc[:date, PORTFOLIO + VALUE_SUFFIX].max()
-        current_value = portfolio_data.loc[date, PORTFOLIO + VALUE_SUFFIX]
+    # calculate cummulative sum of portfolio expenses as a sum of transaction payments and fees
+    portfolio_expense_data = payments_data.cumsum()
 
-        if max_value == 0:
-            portfolio_data.loc[date, PORTFOLIO + DRAWDOWN_SUFFIX] = 0
-            continue
+    # calculate portfolio value as a sum of securities values
+    portfolio_value_data = securities_value_data.sum(axis=1)
 
-        portfolio_data.loc[date, PORTFOLIO + DRAWDOWN_SUFFIX] = (
-            current_value - max_value
-        ) / max_value
+    # calculate portfolio profit as a difference between portfolio value and portfolio expense
+    portfolio_profit_data = portfolio_value_data - portfolio_expense_data
+
+    # calculate portfolio drawdowns as a relative difference between current portfolio value and its maximal value until a given date
+    # drawdown is set to 0 as long as the maximal portfolio value is 0
+    portfolio_drawdown_data = drawdown(portfolio_value_data)
 
     # concatenate columns to leave into one list
-    columns_to_leave = [
+    columns_to_leave = (
         securities_count
         + securities_value
         + securities_unit_value
@@ -400,10 +521,26 @@ def calculate_portfolio_values(
             PORTFOLIO + PROFIT_SUFFIX,
             PORTFOLIO + DRAWDOWN_SUFFIX,
         ]
-    ]
+    )
 
-    # leave only specified columns
-    portfolio_data = portfolio_data[columns_to_leave[0]]
+    # assign all the calculated blocks back to portfolio data at once leaving only specified columns
+    portfolio_data = pd.DataFrame(
+        np.hstack(
+            [
+                securities_count_data,
+                securities_value_data,
+                securities_unit_value_data,
+                securities_expense_data,
+                securities_profit_data,
+                portfolio_value_data[:, None],
+                portfolio_expense_data[:, None],
+                portfolio_profit_data[:, None],
+                portfolio_drawdown_data[:, None],
+            ]
+        ),
+        index=portfolio_data.index,
+        columns=columns_to_leave,
+    )
 
     return portfolio_data
 
@@ -428,23 +565,25 @@ def calculate_current_status(portfolio_data_calculations, weight_groups, securit
     """
     portfolio_current_data = portfolio_data_calculations.iloc[-1].copy()
 
-    securities_value = [col + VALUE_SUFFIX for col in securities]
-
-    # for storing current value for each weights group
-    weight_groups_current_values = {}
-
-    # calculate current values for each weights group
-    for security_name, security_value in zip(securities, securities_value):
-        security_current_value = portfolio_current_data[security_value]
-        weight_group = [
-            key for key, value in weight_groups.items() if security_name in value
-        ][0]
-        weight_groups_current_values.update(
-            {
-                weight_group: security_current_value
-                + weight_groups_current_values.get(weight_group, 0)
-            }
-        )
+    # map each security to its weights group
+    security_to_weight_group = {
+        security_name: weight_group
+        for weight_group, securities_names in weight_groups.items()
+        for security_name in securities_names
+    }
+
+    # current value for each security indexed by security name
+    securities_current_values = pd.Series(
+        {
+            security_name: portfolio_current_data[security_name + VALUE_SUFFIX]
+            for security_name in securities
+        }
+    )
+
+    # calculate current values for each weights group keeping the order in which groups appear in securities
+    weight_groups_current_values = securities_current_values.groupby(
+        security_to_weight_group, sort=False
+    ).sum()
 
     for (
         weight_group,
@@ -0,0 +1,54 @@
+from numba import njit, prange
+import numpy as np
+
+
+@njit(cache=True, fastmath=True)
+def drawdown(values):
+    """
+    Calculates drawdowns of the values in a single pass
+
+    Parameters
+    ----------
+    values : ndarray
+        One dimensional array with values ordered by date
+
+    Returns
+    -------
+    ndarray
+        Array with relative differences between values and their maximal values until a given position, 0 as long as the maximal value is 0
+    """
+    drawdowns = np.empty_like(values)
+    max_value = 0.0
+    for i in range(values.size):
+        value = values[i]
+        if value > max_value:
+            max_value = value
+        drawdowns[i] = 0.0 if max_value == 0 else (value - max_value) / max_value
+    return drawdowns
+
+
+@njit(cache=True, parallel=True)
+def nan_to_zero_cumsum(values):
+    """
+    Calculates cumulative sums of the values for each column with NaN values treated as 0 in a single pass
+
+    Parameters
+    ----------
+    values : ndarray
+        Two dimensional array with values ordered by date in rows and series in columns
+
+    Returns
+    -------
+    ndarray
+        Array with cumulative sums calculated for each column
+    """
+    rows, columns = values.shape
+    cumsums = np.empty_like(values)
+    for column in prange(columns):
+        cumsum = 0.0
+        for row in range(rows):
+            value = values[row, column]
+            if not np.isnan(value):
+                cumsum += value
+            cumsums[row, column] = cumsum
+    return cumsums